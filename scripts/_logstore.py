@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Shared storage helpers for the multi-agent scripts.
+Reads and writes the YAML summary files and the JSON-lines activity store
+that sits next to the activity log, and maintains the last-5 run averages
+both summaries carry.
+"""
+
+import yaml
+import json
+import os
+from typing import Dict, List, Any, Optional
+
+try:
+    from yaml import CSafeLoader, CSafeDumper
+except ImportError:  # libyaml not available, fall back to pure-Python
+    from yaml import SafeLoader as CSafeLoader, SafeDumper as CSafeDumper
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson not installed, fall back to the stdlib
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    _json_loads = json.loads
+
+
+def load(file_path: str) -> Dict[str, Any]:
+    """Load a YAML file."""
+    with open(file_path, 'r') as f:
+        return yaml.load(f, Loader=CSafeLoader)
+
+
+def save(file_path: str, data: Dict[str, Any]) -> None:
+    """Save data to a YAML file."""
+    with open(file_path, 'w') as f:
+        yaml.dump(data, f, Dumper=CSafeDumper, default_flow_style=False, sort_keys=False, indent=2)
+
+
+def dump(data: Dict[str, Any]) -> str:
+    """Render data as a YAML string."""
+    return yaml.dump(data, Dumper=CSafeDumper, default_flow_style=False, sort_keys=False, indent=2)
+
+
+def _adjust_running_sums(sums: Dict[str, Any], run: Dict[str, Any], sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) a run from the running sums."""
+    if run['timestamp'] is None:
+        return
+    sums['files_edited'] += sign * run['files_edited']
+    sums['lines_added'] += sign * run['lines_added']
+    sums['lines_deleted'] += sign * run['lines_deleted']
+    sums['cycles_included'] += sign
+
+
+def record_run(stats: Dict[str, Any], runs_key: str, run_data: Dict[str, Any], max_runs: int = 5) -> None:
+    """Append a run to the last-runs history in stats and refresh its running average.
+    
+    The sums behind the average are stored under ``running_sums_last_5`` so each
+    update is O(1); files saved before they existed are seeded from the history once.
+    """
+    # Maintain only the last max_runs runs
+    if runs_key not in stats:
+        stats[runs_key] = []
+    runs = stats[runs_key]
+    
+    sums = stats.get('running_sums_last_5')
+    if sums is None:
+        sums = {'files_edited': 0, 'lines_added': 0, 'lines_deleted': 0, 'cycles_included': 0}
+        for run in runs:
+            _adjust_running_sums(sums, run, 1)
+    
+    runs.append(run_data)
+    _adjust_running_sums(sums, run_data, 1)
+    while len(runs) > max_runs:
+        _adjust_running_sums(sums, runs.pop(0), -1)
+    stats['running_sums_last_5'] = sums
+    
+    # Calculate running averages
+    cycles = sums['cycles_included']
+    if cycles:
+        stats['running_average_last_5'] = {
+            'files_edited': sums['files_edited'] / cycles,
+            'lines_added': sums['lines_added'] / cycles,
+            'lines_deleted': sums['lines_deleted'] / cycles,
+            'cycles_included': cycles
+        }
+
+
+def get_activities_file(log_file: str) -> str:
+    """Return the JSON-lines activity store that sits next to the YAML log."""
+    return os.path.splitext(log_file)[0] + '.ndjson'
+
+
+def load_activities(log_file: str, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Load activities from the JSON-lines store next to the YAML log.
+    
+    Falls back to the inline ``activities`` list of older YAML logs.
+    """
+    activities_file = get_activities_file(log_file)
+    if not os.path.exists(activities_file):
+        activities = load(log_file).get('activities') or []
+        return activities[-last_n:] if last_n else activities
+    
+    if last_n:
+        return tail(activities_file, last_n)
+    
+    with open(activities_file, 'rb') as f:
+        return [_json_loads(line) for line in f if line.strip()]
+
+
+def append_activities(log_file: str, activities: List[Dict[str, Any]]) -> None:
+    """Append activities to the JSON-lines store, one object per line."""
+    with open(get_activities_file(log_file), 'ab') as f:
+        for activity in activities:
+            f.write(_json_dumps(activity) + b"\n")
+
+
+def tail(file_path: str, n: int, block_size: int = 4096) -> List[Dict[str, Any]]:
+    """Parse only the last n lines of a JSON-lines file by reading it backwards."""
+    with open(file_path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        chunk = b''
+        # Need n + 1 newlines to be sure the oldest of the n lines is complete
+        while pos > 0 and chunk.count(b'\n') <= n:
+            step = min(pos, n * block_size)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+    
+    lines = chunk.splitlines()
+    if pos > 0:
+        lines = lines[1:]  # Drop the partial line we started reading from
+    return [_json_loads(line) for line in lines[-n:] if line.strip()]
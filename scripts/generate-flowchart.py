@@ -3,18 +3,17 @@
 Generate Mermaid flowcharts from agent activity logs.
 """
 
-import yaml
 import argparse
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
 
+from _logstore import load_activities
 
-def load_activity_log(file_path: str) -> Dict[str, Any]:
-    """Load the agent activity log YAML file."""
-    with open(file_path, 'r') as f:
-        return yaml.safe_load(f)
+VERBOSE_NODE_TEMPLATE = '    {node_id}["{agent}<br/>{instruction}<br/>{duration}, {lines} lines"]'
 
 
+@lru_cache(maxsize=1024)
 def format_duration(seconds: int) -> str:
     """Format duration in human readable format."""
     if seconds < 60:
@@ -59,13 +58,14 @@ def generate_agent_flowchart(
             summary['total_duration'] += activity.get('duration', 0)
             summary['total_lines_added'] += activity.get('lines_added', 0)
             summary['total_lines_removed'] += activity.get('lines_removed', 0)
-            summary['total_files'].update(activity.get('artifacts', []))
+            summary['total_files'].update(activity.get('artifacts', ()))
             summary['activities'] += 1
             if activity.get('phase'):
                 summary['phases'].add(activity['phase'])
         
         # Create condensed nodes
-        for i, (agent, summary) in enumerate(agent_summary.items()):
+        prev_agent = None
+        for agent, summary in agent_summary.items():
             duration_str = format_duration(summary['total_duration'])
             lines_net = summary['total_lines_added'] - summary['total_lines_removed']
             lines_str = f"+{lines_net}" if lines_net >= 0 else str(lines_net)
@@ -74,40 +74,48 @@ def generate_agent_flowchart(
             node_label = f"{agent.title()}<br/>{duration_str}<br/>{lines_str} lines<br/>{len(summary['total_files'])} files<br/>Phase {phases_str}"
             mermaid.append(f'    {agent}["{node_label}"]')
             
-            if i > 0:
-                prev_agent = list(agent_summary.keys())[i-1]
+            if prev_agent is not None:
                 mermaid.append(f'    {prev_agent} --> {agent}')
+            
+            prev_agent = agent
     
     else:
-        # Verbose view - show each activity
+        # Verbose view - show each activity; one node per activity plus an
+        # edge between consecutive nodes, so the size is known up front
+        mermaid = [None] * (1 + 2 * len(activities))
+        mermaid[0] = "graph TD"
+        idx = 1
         prev_node = None
         
         for i, activity in enumerate(activities):
             agent = activity['agent']
-            task = activity.get('task', f"task-{i}")
-            duration_str = format_duration(activity.get('duration', 0))
-            lines_added = activity.get('lines_added', 0)
-            lines_removed = activity.get('lines_removed', 0)
-            lines_net = lines_added - lines_removed
-            lines_str = f"+{lines_net}" if lines_net >= 0 else str(lines_net)
+            lines_net = activity.get('lines_added', 0) - activity.get('lines_removed', 0)
             
             # Create unique node ID
             node_id = f"{agent}_{i}"
             
             # Create node label
-            instruction = activity.get('instruction', 'Unknown task')[:30]
-            if len(activity.get('instruction', '')) > 30:
-                instruction += "..."
-            
-            node_label = f"{agent.title()}<br/>{instruction}<br/>{duration_str}, {lines_str} lines"
+            instruction = activity.get('instruction', 'Unknown task')
+            if len(instruction) > 30:
+                instruction = instruction[:30] + "..."
             
-            mermaid.append(f'    {node_id}["{node_label}"]')
+            mermaid[idx] = VERBOSE_NODE_TEMPLATE.format(
+                node_id=node_id,
+                agent=agent.title(),
+                instruction=instruction,
+                duration=format_duration(activity.get('duration', 0)),
+                lines=f"+{lines_net}" if lines_net >= 0 else str(lines_net)
+            )
+            idx += 1
             
             # Add connection from previous node
             if prev_node:
-                mermaid.append(f'    {prev_node} --> {node_id}')
+                mermaid[idx] = f'    {prev_node} --> {node_id}'
+                idx += 1
             
             prev_node = node_id
+        
+        del mermaid[idx:]
     
     return "\n".join(mermaid)
 
@@ -118,13 +126,23 @@ def display_summary_stats(activities: List[Dict[str, Any]]) -> None:
         print("No activities to display")
         return
     
-    total_duration = sum(a.get('duration', 0) for a in activities)
-    total_lines_added = sum(a.get('lines_added', 0) for a in activities)
-    total_lines_removed = sum(a.get('lines_removed', 0) for a in activities)
-    total_files = len(set(f for a in activities for f in a.get('artifacts', [])))
-    
-    agents = list(set(a['agent'] for a in activities))
-    phases = list(set(a.get('phase') for a in activities if a.get('phase')))
+    # Aggregate everything in a single pass over the activities
+    total_duration = 0
+    total_lines_added = 0
+    total_lines_removed = 0
+    files = set()
+    agents = set()
+    phases = set()
+    for a in activities:
+        total_duration += a.get('duration', 0)
+        total_lines_added += a.get('lines_added', 0)
+        total_lines_removed += a.get('lines_removed', 0)
+        files.update(a.get('artifacts', ()))
+        agents.add(a['agent'])
+        phase = a.get('phase')
+        if phase:
+            phases.add(phase)
+    total_files = len(files)
     
     print(f"\n[SUMMARY] Flowchart Summary")
     print(f"Activities: {len(activities)}")
@@ -153,8 +171,7 @@ def main():
     
     # Load activity log
     try:
-        data = load_activity_log(args.log_file)
-        activities = data.get('activities', [])
+        activities = load_activities(args.log_file, args.last_n)
     except FileNotFoundError:
         print(f"[ERROR] Log file not found: {args.log_file}")
         return
@@ -166,9 +183,8 @@ def main():
         print("No activities found in log file")
         return
     
-    # Filter activities if requested
+    # Activities were already trimmed while loading
     if args.last_n:
-        activities = activities[-args.last_n:]
         print(f"Showing last {len(activities)} activities")
     
     # Display stats if requested
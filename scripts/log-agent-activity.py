@@ -2,25 +2,30 @@
 """
 Agent Activity Logger
 Logs agent activities and maintains running statistics in YAML format.
+Activities themselves are appended to a sibling JSON-lines file so that
+logging one activity does not rewrite the whole history.
 """
 
-import yaml
 import os
 import sys
 from datetime import datetime, timezone
+from itertools import chain
 from typing import Dict, List, Any, Optional
 import argparse
 
+from _logstore import load, save, dump, load_activities, append_activities, record_run
+
 
 def load_activity_log(file_path: str) -> Dict[str, Any]:
     """Load the agent activity log YAML file."""
     if not os.path.exists(file_path):
         # Create initial structure if file doesn't exist
+        now_iso = datetime.now(timezone.utc).isoformat()
         return {
             'metadata': {
                 'project': 'Multi-Agent Project',
-                'created': datetime.now(timezone.utc).isoformat(),
-                'last_updated': datetime.now(timezone.utc).isoformat(),
+                'created': now_iso,
+                'last_updated': now_iso,
                 'log_version': '1.0'
             },
             'statistics': {
@@ -37,28 +42,31 @@ def load_activity_log(file_path: str) -> Dict[str, Any]:
                     'cycles_included': 0
                 },
                 'last_5_runs': [],
+                'running_sums_last_5': {
+                    'files_edited': 0,
+                    'lines_added': 0,
+                    'lines_deleted': 0,
+                    'cycles_included': 0
+                },
                 'totals': {
                     'total_agents_run': 0,
                     'total_duration': 0,
                     'total_lines_added': 0,
                     'total_lines_removed': 0,
                     'total_files_modified': 0,
-                    'unique_files_touched': 0
+                    'unique_files_touched': 0,
+                    'unique_file_list': []
                 }
-            },
-            'activities': []
+            }
         }
     
-    with open(file_path, 'r') as f:
-        return yaml.safe_load(f)
+    return load(file_path)
 
 
-def save_activity_log(data: Dict[str, Any], file_path: str) -> None:
+def save_activity_log(data: Dict[str, Any], file_path: str, now_iso: Optional[str] = None) -> None:
     """Save the agent activity log to YAML file."""
-    data['metadata']['last_updated'] = datetime.now(timezone.utc).isoformat()
-    
-    with open(file_path, 'w') as f:
-        yaml.dump(data, f, default_flow_style=False, sort_keys=False, indent=2)
+    data['metadata']['last_updated'] = now_iso or datetime.now(timezone.utc).isoformat()
+    save(file_path, data)
 
 
 def update_running_averages(data: Dict[str, Any], new_run: Dict[str, Any]) -> None:
@@ -81,23 +89,7 @@ def update_running_averages(data: Dict[str, Any], new_run: Dict[str, Any]) -> No
         'timestamp': new_run.get('timestamp')
     }
     
-    # Maintain only last 5 runs
-    if 'last_5_runs' not in stats:
-        stats['last_5_runs'] = []
-    
-    stats['last_5_runs'].append(run_data)
-    if len(stats['last_5_runs']) > 5:
-        stats['last_5_runs'] = stats['last_5_runs'][-5:]
-    
-    # Calculate running averages
-    valid_runs = [run for run in stats['last_5_runs'] if run['timestamp'] is not None]
-    if valid_runs:
-        stats['running_average_last_5'] = {
-            'files_edited': sum(r['files_edited'] for r in valid_runs) / len(valid_runs),
-            'lines_added': sum(r['lines_added'] for r in valid_runs) / len(valid_runs),
-            'lines_deleted': sum(r['lines_deleted'] for r in valid_runs) / len(valid_runs),
-            'cycles_included': len(valid_runs)
-        }
+    record_run(stats, 'last_5_runs', run_data)
 
 
 def update_totals(data: Dict[str, Any], new_activity: Dict[str, Any]) -> None:
@@ -110,12 +102,17 @@ def update_totals(data: Dict[str, Any], new_activity: Dict[str, Any]) -> None:
     totals['total_lines_removed'] += new_activity.get('lines_removed', 0)
     totals['total_files_modified'] += new_activity.get('files_modified', 0)
     
-    # Update unique files touched
-    all_artifacts = set()
-    for activity in data['activities']:
-        all_artifacts.update(activity.get('artifacts', []))
-    all_artifacts.update(new_activity.get('artifacts', []))
+    # Update unique files touched from the cached list rather than rescanning
+    # every activity; logs written before the cache existed are seeded once.
+    if 'unique_file_list' in totals:
+        all_artifacts = set(totals['unique_file_list'])
+    else:
+        all_artifacts = set(chain.from_iterable(
+            activity.get('artifacts', ()) for activity in data.get('activities', [])
+        ))
+    all_artifacts.update(new_activity.get('artifacts', ()))
     totals['unique_files_touched'] = len(all_artifacts)
+    totals['unique_file_list'] = sorted(all_artifacts)
 
 
 def log_agent_activity(
@@ -139,13 +136,14 @@ def log_agent_activity(
     notes: Optional[str] = None
 ) -> None:
     """Log a new agent activity."""
+    now_iso = datetime.now(timezone.utc).isoformat()
     
     # Load existing log
     data = load_activity_log(log_file)
     
     # Create new activity entry
     activity = {
-        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'timestamp': now_iso,
         'agent': agent,
         'agent_type': agent_type,
         'phase': phase,
@@ -165,15 +163,18 @@ def log_agent_activity(
         'notes': notes
     }
     
-    # Add to activities list
-    data['activities'].append(activity)
-    
     # Update statistics
     update_running_averages(data, activity)
     update_totals(data, activity)
     
-    # Save updated log
-    save_activity_log(data, log_file)
+    # Append to the activity store; older logs kept activities inline in the
+    # YAML, so move those across first to preserve ordering
+    pending = data.pop('activities', None) or []
+    pending.append(activity)
+    append_activities(log_file, pending)
+    
+    # Save updated summary
+    save_activity_log(data, log_file, now_iso=now_iso)
     
     print(f"[OK] Logged activity: {agent} - {instruction[:50]}...")
     print(f"   Duration: {duration}s, +{lines_added}/-{lines_removed} lines, {files_modified} files")
@@ -209,6 +210,16 @@ def display_stats(log_file: str) -> None:
         print(f"  Timestamp: {last['timestamp']}")
 
 
+def display_yaml(log_file: str) -> None:
+    """Print the summary and all activities as one YAML document."""
+    data = load_activity_log(log_file)
+    try:
+        data['activities'] = load_activities(log_file)
+    except FileNotFoundError:
+        data['activities'] = []  # Nothing logged yet
+    print(dump(data), end='')
+
+
 def main():
     parser = argparse.ArgumentParser(description='Log agent activities')
     parser.add_argument('--log-file', default='logs/agent-activity.yaml', 
@@ -231,6 +242,8 @@ def main():
     parser.add_argument('--critical-path', action='store_true', help='Is this on critical path')
     parser.add_argument('--notes', help='Additional notes')
     parser.add_argument('--stats', action='store_true', help='Display statistics only')
+    parser.add_argument('--to-yaml', action='store_true',
+                       help='Print the full log, including activities, as YAML')
     
     args = parser.parse_args()
     
@@ -238,6 +251,10 @@ def main():
         display_stats(args.log_file)
         return
     
+    if args.to_yaml:
+        display_yaml(args.log_file)
+        return
+    
     if not all([args.agent, args.agent_type, args.instruction, args.result, args.duration]):
         print("[ERROR] Missing required arguments: --agent, --agent-type, --instruction, --result, --duration")
         parser.print_help()
@@ -4,15 +4,32 @@ Codebase Scanner for Cleanup Agent
 Scans entire codebase and updates cleanup tracking file with file status.
 """
 
-import yaml
+import mmap
 import os
+import re
 import sys
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
 import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from _logstore import load, save, record_run
+
+SOURCE_EXTENSIONS = ('.py', '.js', '.ts', '.java', '.cpp', '.c', '.h', '.cs', '.rb', '.go', '.rs', '.php')
+IGNORE_DIRS = frozenset({'.git', '__pycache__', 'node_modules', '.pytest_cache', 'venv', 'env', '.venv'})
+
+# Byte patterns used to scan memory-mapped files without decoding them.
+# LINE_START_RE matches once per line, capturing its first non-blank byte
+# (empty for blank lines), so line, non-empty and comment counts share a pass.
+LINE_START_RE = re.compile(rb'^[^\S\n]*(\S?)', re.MULTILINE)
+# Complexity indicators in one alternation: 'if ', 'for ', 'while ', 'try:',
+# 'except:', 'elif ', 'def ', 'class '. An 'elif ' also contains 'if ', so it
+# counts twice; the (el) group marks those matches.
+COMPLEXITY_RE = re.compile(rb'(el)?if |for |while |try:|except:|def |class ')
+MAX_COMPLEXITY_SCORE = 20
+
 
 def load_cleanup_tracker(file_path: str) -> Dict[str, Any]:
     """Load the cleanup tracker YAML file."""
@@ -33,8 +50,15 @@ def load_cleanup_tracker(file_path: str) -> Dict[str, Any]:
                     'cycles_included': 0
                 },
                 'last_5_cleanup_runs': [],
+                'running_sums_last_5': {
+                    'files_edited': 0,
+                    'lines_added': 0,
+                    'lines_deleted': 0,
+                    'cycles_included': 0
+                },
                 'last_full_scan': None,
                 'next_scan_due': None,
+                'last_scanned_commit': None,
                 'scan_interval_hours': 24,
                 'thresholds': {
                     'max_lines_per_file': 500,
@@ -45,68 +69,131 @@ def load_cleanup_tracker(file_path: str) -> Dict[str, Any]:
             'files': {}
         }
     
-    with open(file_path, 'r') as f:
-        return yaml.safe_load(f)
+    return load(file_path)
 
 
 def save_cleanup_tracker(data: Dict[str, Any], file_path: str) -> None:
     """Save the cleanup tracker to YAML file."""
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w') as f:
-        yaml.dump(data, f, default_flow_style=False, sort_keys=False, indent=2)
+    save(file_path, data)
 
 
 def get_all_source_files(root_dir: str = '.') -> List[str]:
     """Get all source code files in the project."""
-    source_extensions = {'.py', '.js', '.ts', '.java', '.cpp', '.c', '.h', '.cs', '.rb', '.go', '.rs', '.php'}
-    ignore_dirs = {'.git', '__pycache__', 'node_modules', '.pytest_cache', 'venv', 'env', '.venv'}
-    ignore_files = {'__pycache__', '.pyc', '.pyo', '.pyd'}
-    
     source_files = []
     
-    for root, dirs, files in os.walk(root_dir):
-        # Remove ignored directories from traversal
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
+    # Iterative scandir walk; DirEntry caches the file type from the listing
+    stack = [(root_dir, '')]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        try:
+            entries = os.scandir(dir_path)
+        except OSError:
+            continue
         
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, root_dir)
-            
-            # Skip ignored files
-            if any(ignore in file for ignore in ignore_files):
-                continue
-                
-            # Check if it's a source file
-            if any(file.endswith(ext) for ext in source_extensions):
-                source_files.append(rel_path.replace('\\', '/'))  # Normalize path separators
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    # Skip ignored directories entirely
+                    if entry.name not in IGNORE_DIRS:
+                        stack.append((entry.path, rel_dir + entry.name + '/'))
+                elif entry.name.endswith(SOURCE_EXTENSIONS) and entry.is_file():
+                    source_files.append(rel_dir + entry.name)
     
     return sorted(source_files)
 
 
+def get_last_modified(file_path: str) -> str:
+    """Get a file's modification time as an ISO timestamp."""
+    return datetime.fromtimestamp(os.path.getmtime(file_path), timezone.utc).isoformat()
+
+
+def get_git_head(root_dir: str) -> Optional[str]:
+    """Get the HEAD commit of the git repository containing root_dir, if any."""
+    try:
+        result = subprocess.run(['git', '-C', root_dir, 'rev-parse', 'HEAD'],
+                                capture_output=True, text=True)
+    except OSError:
+        return None  # git not installed
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def get_changed_source_files(root_dir: str, since_commit: str) -> Optional[List[str]]:
+    """Get source files changed since a commit, including working tree changes.
+    
+    Diffing the commit against the working tree covers committed, staged and
+    unstaged changes to tracked files; untracked files are listed separately.
+    Returns None if git can't answer (e.g. the commit no longer exists).
+    """
+    commands = [
+        ['git', '-C', root_dir, 'diff', '--name-only', '--relative', '-z', since_commit],
+        ['git', '-C', root_dir, 'ls-files', '--others', '--exclude-standard', '-z'],
+    ]
+    changed = set()
+    for command in commands:
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except OSError:
+            return None
+        if result.returncode != 0:
+            return None
+        changed.update(path for path in result.stdout.split('\0') if path)
+    
+    return sorted(
+        path for path in changed
+        if path.endswith(SOURCE_EXTENSIONS) and IGNORE_DIRS.isdisjoint(path.split('/')[:-1])
+    )
+
+
+def is_full_scan_due(metadata: Dict[str, Any]) -> bool:
+    """Check whether the scheduled full scan interval has elapsed."""
+    next_scan_due = metadata.get('next_scan_due')
+    if not next_scan_due:
+        return True
+    return datetime.fromisoformat(next_scan_due) <= datetime.now(timezone.utc)
+
+
+def needs_scan(file_info: Optional[Dict[str, Any]], file_path: str) -> bool:
+    """Check whether a file is new or was modified since it was last scanned."""
+    if file_info is None:
+        return True
+    try:
+        return file_info.get('last_modified') != get_last_modified(file_path)
+    except OSError:
+        return True
+
+
 def get_file_stats(file_path: str) -> Dict[str, Any]:
     """Get basic statistics about a file."""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+        total_lines = non_empty_lines = comment_lines = complexity_score = 0
         
-        # Basic metrics
-        total_lines = len(lines)
-        non_empty_lines = len([line for line in lines if line.strip()])
-        comment_lines = len([line for line in lines if line.strip().startswith('#')])
+        with open(file_path, 'rb') as f:
+            # mmap can't map empty files; they keep the zero counts above
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    # Basic metrics
+                    first_bytes = LINE_START_RE.findall(m)
+                    # A trailing newline leaves an empty match at end of file
+                    total_lines = len(first_bytes) - (m[-1:] == b'\n')
+                    non_empty_lines = len(first_bytes) - first_bytes.count(b'')
+                    comment_lines = first_bytes.count(b'#')
+                    
+                    # Simple complexity score (very basic)
+                    # The score is capped, so stop scanning once the cap is reached
+                    for match in COMPLEXITY_RE.finditer(m):
+                        complexity_score += 2 if match.group(1) else 1
+                        if complexity_score >= MAX_COMPLEXITY_SCORE:
+                            break
         
         # Get file modification time
-        stat = os.stat(file_path)
-        last_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
-        
-        # Simple complexity score (very basic)
-        complexity_indicators = ['if ', 'for ', 'while ', 'try:', 'except:', 'elif ', 'def ', 'class ']
-        complexity_score = sum(line.count(indicator) for line in lines for indicator in complexity_indicators)
+        last_modified = get_last_modified(file_path)
         
         return {
             'size_lines': total_lines,
             'non_empty_lines': non_empty_lines,
             'comment_lines': comment_lines,
-            'complexity_score': min(complexity_score, 20),  # Cap at 20
+            'complexity_score': min(complexity_score, MAX_COMPLEXITY_SCORE),
             'last_modified': last_modified,
         }
     
@@ -121,16 +208,19 @@ def get_file_stats(file_path: str) -> Dict[str, Any]:
         }
 
 
-def update_cleanup_stats(tracker: Dict[str, Any], files_edited: int, lines_added: int, lines_deleted: int) -> None:
+def update_cleanup_stats(tracker: Dict[str, Any], files_edited: int, lines_added: int, lines_deleted: int,
+                         full_scan: bool = True) -> None:
     """Update cleanup statistics with new run data."""
     metadata = tracker['metadata']
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
     
     # Update last_run
     metadata['last_run'] = {
         'files_edited': files_edited,
         'lines_added': lines_added,
         'lines_deleted': lines_deleted,
-        'timestamp': datetime.now(timezone.utc).isoformat()
+        'timestamp': now_iso
     }
     
     # Add to last_5_cleanup_runs history
@@ -138,83 +228,106 @@ def update_cleanup_stats(tracker: Dict[str, Any], files_edited: int, lines_added
         'files_edited': files_edited,
         'lines_added': lines_added,
         'lines_deleted': lines_deleted,
-        'timestamp': datetime.now(timezone.utc).isoformat()
+        'timestamp': now_iso
     }
     
-    if 'last_5_cleanup_runs' not in metadata:
-        metadata['last_5_cleanup_runs'] = []
-    
-    metadata['last_5_cleanup_runs'].append(run_data)
-    if len(metadata['last_5_cleanup_runs']) > 5:
-        metadata['last_5_cleanup_runs'] = metadata['last_5_cleanup_runs'][-5:]
-    
-    # Calculate running averages
-    valid_runs = [run for run in metadata['last_5_cleanup_runs'] if run['timestamp'] is not None]
-    if valid_runs:
-        metadata['running_average_last_5'] = {
-            'files_edited': sum(r['files_edited'] for r in valid_runs) / len(valid_runs),
-            'lines_added': sum(r['lines_added'] for r in valid_runs) / len(valid_runs),
-            'lines_deleted': sum(r['lines_deleted'] for r in valid_runs) / len(valid_runs),
-            'cycles_included': len(valid_runs)
-        }
+    record_run(metadata, 'last_5_cleanup_runs', run_data)
     
     # Update scan timestamps
-    metadata['last_full_scan'] = datetime.now(timezone.utc).isoformat()
-    next_scan = datetime.now(timezone.utc).timestamp() + (metadata['scan_interval_hours'] * 3600)
-    metadata['next_scan_due'] = datetime.fromtimestamp(next_scan, timezone.utc).isoformat()
+    if full_scan:
+        metadata['last_full_scan'] = now_iso
+        next_scan = now.timestamp() + (metadata['scan_interval_hours'] * 3600)
+        metadata['next_scan_due'] = datetime.fromtimestamp(next_scan, timezone.utc).isoformat()
 
 
-def scan_codebase(tracker_file: str, root_dir: str = '.') -> None:
-    """Scan the entire codebase and update tracking file."""
+def scan_codebase(tracker_file: str, root_dir: str = '.', full_scan: bool = False) -> None:
+    """Scan the codebase and update tracking file.
+    
+    Inside a git repository, the tree is not walked until the next scheduled
+    full scan is due: files git reports as changed since the last scanned
+    commit are checked, and already tracked files are only stat'ed.
+    """
     print("[SCAN] Scanning codebase for cleanup tracking...")
     
     # Load existing tracker
     tracker = load_cleanup_tracker(tracker_file)
+    metadata = tracker['metadata']
+    
+    # Use git to narrow the scan to changed files when possible
+    head_commit = get_git_head(root_dir)
+    last_commit = metadata.get('last_scanned_commit')
+    changed_files = None
+    if head_commit and last_commit and not full_scan and not is_full_scan_due(metadata):
+        changed_files = get_changed_source_files(root_dir, last_commit)
     
-    # Get all source files
-    source_files = get_all_source_files(root_dir)
-    print(f"Found {len(source_files)} source files")
+    if changed_files is None:
+        # Get all source files
+        source_files = get_all_source_files(root_dir)
+        print(f"Found {len(source_files)} source files")
+        current_files = set(source_files)
+        removed_files = [p for p in tracker['files'] if p not in current_files]
+    else:
+        source_files = [p for p in changed_files if os.path.isfile(os.path.join(root_dir, p))]
+        print(f"Found {len(source_files)} changed source files since {last_commit[:7]}")
+        # git doesn't report deleted untracked files or reverted working tree
+        # edits, so re-check tracked files it didn't mention with a stat
+        changed_set = set(changed_files)
+        source_files += [
+            p for p in tracker['files']
+            if p not in changed_set and os.path.isfile(os.path.join(root_dir, p))
+        ]
+        current_files = set(source_files)
+        removed_files = [p for p in tracker['files'] if p not in current_files]
     
     # Track changes
     files_added = 0
     files_updated = 0
-    files_removed = 0
+    files_removed = len(removed_files)
     
-    # Update file tracking
-    current_files = set(source_files)
-    tracked_files = set(tracker['files'].keys())
+    # Remove files that no longer exist, rebuilding the mapping once
+    if removed_files:
+        removed_set = set(removed_files)
+        tracker['files'] = {p: info for p, info in tracker['files'].items() if p not in removed_set}
+        for file_path in removed_files:
+            print(f"[REMOVED]  Removed deleted file: {file_path}")
     
-    # Remove files that no longer exist
-    for file_path in tracked_files - current_files:
-        del tracker['files'][file_path]
-        files_removed += 1
-        print(f"[REMOVED]  Removed deleted file: {file_path}")
+    # Only read files that are new or whose modification time changed
+    paths_to_scan = [
+        file_path for file_path in source_files
+        if needs_scan(tracker['files'].get(file_path), os.path.join(root_dir, file_path))
+    ]
     
-    # Add or update existing files
-    for file_path in source_files:
-        file_stats = get_file_stats(os.path.join(root_dir, file_path))
+    # Gather stats concurrently; only the open/fstat/mmap syscalls release the GIL,
+    # so threads overlap file access while the regex scans still run one at a time
+    max_workers = min(32, (os.cpu_count() or 4) * 2)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        all_stats = executor.map(get_file_stats, [os.path.join(root_dir, p) for p in paths_to_scan])
         
-        if file_path in tracker['files']:
-            # Update existing file
-            existing = tracker['files'][file_path]
-            # Only update if file was modified since last review
-            if existing.get('last_modified') != file_stats['last_modified']:
-                existing.update(file_stats)
-                existing['status'] = 'pending'  # Mark for review
-                files_updated += 1
-        else:
-            # Add new file
-            tracker['files'][file_path] = {
-                'last_reviewed': None,
-                'status': 'pending',
-                'lines_cleaned': 0,
-                'notes': 'Newly discovered file, pending initial review',
-                **file_stats
-            }
-            files_added += 1
+        # Add or update existing files
+        for file_path, file_stats in zip(paths_to_scan, all_stats):
+            existing = tracker['files'].get(file_path)
+            
+            if existing is not None:
+                # Update existing file
+                # Only update if file was modified since last review
+                if existing.get('last_modified') != file_stats['last_modified']:
+                    existing.update(file_stats)
+                    existing['status'] = 'pending'  # Mark for review
+                    files_updated += 1
+            else:
+                # Add new file
+                tracker['files'][file_path] = {
+                    'last_reviewed': None,
+                    'status': 'pending',
+                    'lines_cleaned': 0,
+                    'notes': 'Newly discovered file, pending initial review',
+                    **file_stats
+                }
+                files_added += 1
     
     # Update metadata with scan results
-    update_cleanup_stats(tracker, files_added + files_updated, 0, 0)
+    update_cleanup_stats(tracker, files_added + files_updated, 0, 0, full_scan=changed_files is None)
+    metadata['last_scanned_commit'] = head_commit
     
     # Save updated tracker
     save_cleanup_tracker(tracker, tracker_file)
@@ -279,6 +392,8 @@ def main():
                        help='Path to cleanup tracker file')
     parser.add_argument('--root-dir', default='.', help='Root directory to scan')
     parser.add_argument('--stats', action='store_true', help='Display statistics only')
+    parser.add_argument('--full', action='store_true',
+                       help='Scan every file even if only some changed since the last scan')
     
     args = parser.parse_args()
     
@@ -286,7 +401,7 @@ def main():
         display_cleanup_stats(args.tracker_file)
         return
     
-    scan_codebase(args.tracker_file, args.root_dir)
+    scan_codebase(args.tracker_file, args.root_dir, args.full)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,98 @@
+"""
+Tests for the incremental (git-based) codebase scan.
+"""
+
+import importlib.util
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason='git is not installed')
+
+
+@pytest.fixture
+def scanner(monkeypatch):
+    """Load scripts/scan-codebase.py as a module."""
+    # Keep __pycache__ out of scripts/, which the installer copies wholesale
+    monkeypatch.setattr(sys, 'dont_write_bytecode', True)
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    spec = importlib.util.spec_from_file_location('scan_codebase', SCRIPTS_DIR / 'scan-codebase.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def git(repo, *args):
+    subprocess.run(['git', '-C', str(repo), '-c', 'user.name=test', '-c', 'user.email=test@example.com',
+                    *args], check=True, capture_output=True)
+
+
+def tracked_files(tracker_file):
+    with open(tracker_file) as f:
+        return set(yaml.safe_load(f)['files'])
+
+
+def test_incremental_scan_removes_deleted_untracked_file(scanner, tmp_path):
+    """Test that deleting an untracked file drops it on the next incremental scan."""
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    tracker_file = str(tmp_path / 'suggestions' / 'cleanup-tracker.yaml')
+    git(repo, 'init', '-q')
+    (repo / 'a.py').write_text('x = 1\n')
+    git(repo, 'add', 'a.py')
+    git(repo, 'commit', '-q', '-m', 'add a')
+
+    (repo / 'c.py').write_text('y = 2\n')
+    scanner.scan_codebase(tracker_file, str(repo))
+    assert tracked_files(tracker_file) == {'a.py', 'c.py'}
+
+    (repo / 'c.py').unlink()
+    (repo / 'b.py').write_text('z = 3\n')
+    git(repo, 'add', 'b.py')
+    git(repo, 'commit', '-q', '-m', 'add b')
+    scanner.scan_codebase(tracker_file, str(repo))
+    assert tracked_files(tracker_file) == {'a.py', 'b.py'}
+
+
+def test_incremental_scan_picks_up_reverted_edit(scanner, tmp_path):
+    """Test that reverting a working tree edit rescans the file."""
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    tracker_file = str(tmp_path / 'suggestions' / 'cleanup-tracker.yaml')
+    git(repo, 'init', '-q')
+    (repo / 'a.py').write_text('x = 1\n')
+    git(repo, 'add', 'a.py')
+    git(repo, 'commit', '-q', '-m', 'add a')
+
+    (repo / 'a.py').write_text('x = 1\ny = 2\nz = 3\n')
+    scanner.scan_codebase(tracker_file, str(repo))
+
+    git(repo, 'checkout', '--', 'a.py')
+    scanner.scan_codebase(tracker_file, str(repo))
+    with open(tracker_file) as f:
+        assert yaml.safe_load(f)['files']['a.py']['size_lines'] == 1
+
+
+def test_incremental_scan_picks_up_staged_files(scanner, tmp_path):
+    """Test that staged but uncommitted additions and renames are scanned."""
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    tracker_file = str(tmp_path / 'suggestions' / 'cleanup-tracker.yaml')
+    git(repo, 'init', '-q')
+    (repo / 'a.py').write_text('x = 1\n')
+    (repo / 'old.py').write_text('y = 2\n')
+    git(repo, 'add', 'a.py', 'old.py')
+    git(repo, 'commit', '-q', '-m', 'add a and old')
+    scanner.scan_codebase(tracker_file, str(repo))
+
+    (repo / 'new.py').write_text('z = 3\n')
+    git(repo, 'add', 'new.py')
+    git(repo, 'mv', 'old.py', 'moved.py')
+    scanner.scan_codebase(tracker_file, str(repo))
+    assert tracked_files(tracker_file) == {'a.py', 'new.py', 'moved.py'}